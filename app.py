@@ -1,12 +1,13 @@
 import streamlit as st
-import plotly.graph_objects as go
-import matplotlib.pyplot as plt
 from resume_parser import extract_text_from_pdf, extract_text_from_docx
-from feedback_generator import analyze_resume_with_llm
+from feedback_generator import (
+    analyze_resume_with_llm, analyze_resumes_batch, batch_match_scores, find_skills, match_score,
+    MAX_RESUME_CHARS
+)
 from pdf_exporter import export_feedback_as_pdf
 import cohere
-from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import hashlib
+import io
 
 # Initialize session state
 if 'feedback' not in st.session_state:
@@ -19,12 +20,186 @@ if 'api_key_configured' not in st.session_state:
     st.session_state.api_key_configured = False
 if 'cohere_client' not in st.session_state:
     st.session_state.cohere_client = None
+if 'analysis_status' not in st.session_state:
+    st.session_state.analysis_status = None
+if 'batch_results' not in st.session_state:
+    st.session_state.batch_results = None
+if 'score' not in st.session_state:
+    st.session_state.score = None
+if 'skill_coverage' not in st.session_state:
+    st.session_state.skill_coverage = None
+if 'job_role' not in st.session_state:
+    st.session_state.job_role = None
+if 'persona' not in st.session_state:
+    st.session_state.persona = None
 
-# Match score between resume and job description
-def match_score(resume_text, job_description):
-    vect = CountVectorizer().fit_transform([resume_text, job_description])
-    score = cosine_similarity(vect)[0][1]
-    return round(score * 100, 2)
+# One validated client per API key; the raw key is excluded from the cache key.
+# A failed validation raises, so mistyped keys never get a cache entry.
+@st.cache_resource(ttl=3600, max_entries=32, show_spinner=False)
+def _get_client(api_key_hash, _api_key):
+    co = cohere.Client(_api_key)
+    # Listing models checks auth without running a generation
+    _ = co.models.list()
+    return co
+
+# Keyed on the file contents, so re-analyzing the same upload skips parsing.
+# Bounded so uploaded resumes don't stay in server memory indefinitely.
+@st.cache_data(ttl=3600, max_entries=100, show_spinner=False)
+def _extract_resume_text(file_bytes, kind):
+    if kind == "pdf":
+        return extract_text_from_pdf(io.BytesIO(file_bytes))
+    return extract_text_from_docx(io.BytesIO(file_bytes))
+
+# The pie is cached as PNG bytes, so reruns skip both building the figure and
+# the savefig that st.pyplot would run each time. Matplotlib is imported here
+# rather than at the top to keep cold start fast.
+@st.cache_data(ttl=3600, max_entries=100, show_spinner=False)
+def skill_pie_png(found, missing):
+    # A bare Figure isn't registered with pyplot, so nothing keeps it alive after this
+    from matplotlib.figure import Figure
+    fig = Figure()
+    ax = fig.subplots()
+    ax.pie([found, missing],
+           labels=["Matched", "Missing"],
+           autopct="%1.1f%%",
+           colors=["#4CAF50", "#F44336"])
+    ax.set_title("Skill Coverage")
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+# Rendered in memory and cached, so the download is ready without another click
+@st.cache_data(ttl=3600, max_entries=100, show_spinner="Generating PDF...")
+def _feedback_pdf(feedback):
+    return export_feedback_as_pdf(feedback)
+
+def render_score(score):
+    st.metric("Match Score", f"{score}%")
+    st.progress(score / 100)
+    # Built directly: a go.Indicator is cheaper to construct than to unpickle from a cache
+    import plotly.graph_objects as go
+    st.plotly_chart(go.Figure(go.Indicator(
+        mode="gauge+number",
+        value=score,
+        title={'text': "Resume Match Score"},
+        gauge={'axis': {'range': [0, 100]}}
+    )))
+
+def run_analysis(uploaded_file, job_role, job_description, persona):
+    """
+    Extract, score and analyze the resume, recording results in session_state.
+    """
+    st.session_state.analysis_status = None
+    # Extraction and the LLM call run one after the other (the prompt needs the
+    # whole text), so show them as separate steps of one status block
+    with st.status("Analyzing resume...", expanded=True) as status:
+        st.write("Extracting text from resume...")
+        try:
+            kind = "pdf" if uploaded_file.type == "application/pdf" else "docx"
+            resume_text = _extract_resume_text(uploaded_file.getvalue(), kind)
+            if not resume_text.strip():
+                st.session_state.analysis_status = ("error", "No text could be extracted from the resume.")
+                status.update(label="Extraction failed", state="error")
+                return
+            # Only this much is ever sent to the model, so that's all the session keeps;
+            # scoring below still sees the whole resume
+            st.session_state.resume_text = resume_text[:MAX_RESUME_CHARS]
+        except Exception as e:
+            st.session_state.analysis_status = ("error", f"Error extracting text: {str(e)}")
+            status.update(label="Extraction failed", state="error")
+            return
+
+        st.write("Analyzing resume with AI...")
+        try:
+            stream_placeholder = st.empty()
+            feedback = analyze_resume_with_llm(
+                st.session_state.resume_text, job_role, job_description, st.session_state.cohere_client,
+                on_text=stream_placeholder.markdown
+            )
+            stream_placeholder.empty()
+            st.session_state.feedback = feedback
+            st.session_state.analysis_done = True
+            st.session_state.analysis_status = ("success", "Analysis complete!")
+            status.update(label="Analysis complete!", state="complete", expanded=False)
+        except Exception as e:
+            st.session_state.analysis_status = ("error", f"Error analyzing resume: {str(e)}")
+            status.update(label="Analysis failed", state="error")
+            return
+
+    # Only record results here; they're rendered from session_state so they survive later reruns
+    st.session_state.score = None
+    st.session_state.skill_coverage = None
+    if job_description:
+        st.session_state.score = match_score(resume_text, job_description)
+        required_skills = find_skills(job_description)
+        if required_skills:
+            skills_found = len(required_skills & find_skills(resume_text))
+            st.session_state.skill_coverage = (skills_found, len(required_skills) - skills_found)
+    st.session_state.job_role = job_role
+    st.session_state.persona = persona
+
+def run_batch_analysis(uploaded_files, job_role, job_description):
+    """
+    Analyze several resumes for one role, recording (name, score, feedback) rows in session_state.
+    """
+    st.session_state.analysis_status = None
+    names, texts, skipped = [], [], []
+    with st.spinner("Extracting text from resumes..."):
+        for uploaded_file in uploaded_files:
+            try:
+                kind = "pdf" if uploaded_file.type == "application/pdf" else "docx"
+                resume_text = _extract_resume_text(uploaded_file.getvalue(), kind)
+            except Exception as e:
+                skipped.append(f"{uploaded_file.name} ({str(e)})")
+                continue
+            if resume_text.strip():
+                names.append(uploaded_file.name)
+                texts.append(resume_text)
+            else:
+                skipped.append(f"{uploaded_file.name} (no text found)")
+
+    if not texts:
+        st.session_state.analysis_status = (
+            "error", f"No text could be extracted from the resumes: {', '.join(skipped)}"
+        )
+        return
+
+    with st.spinner(f"Analyzing {len(texts)} resumes with AI..."):
+        feedbacks = analyze_resumes_batch(
+            [(resume_text, job_role, job_description) for resume_text in texts],
+            st.session_state.cohere_client
+        )
+    scores = batch_match_scores(texts, job_description) if job_description else [None] * len(texts)
+
+    rows = list(zip(names, scores, feedbacks))
+    if job_description:
+        rows.sort(key=lambda row: row[1], reverse=True)
+    st.session_state.batch_results = rows
+
+    failed = sum(1 for feedback in feedbacks if feedback is None)
+    problems = []
+    if failed:
+        problems.append(f"Analysis failed for {failed} of {len(texts)} resumes.")
+    if skipped:
+        problems.append(f"Skipped: {', '.join(skipped)}")
+    if failed == len(texts):
+        st.session_state.analysis_status = ("error", " ".join(problems))
+    elif problems:
+        st.session_state.analysis_status = ("warning", " ".join(problems))
+    else:
+        st.session_state.analysis_status = ("success", f"Analyzed {len(texts)} resumes!")
+
+def render_batch_results():
+    if not st.session_state.batch_results:
+        return
+    st.subheader("📋 Batch Results")
+    for name, score, feedback in st.session_state.batch_results:
+        label = f"{name} — {score}%" if score is not None else name
+        with st.expander(label):
+            if feedback:
+                st.markdown(feedback)
+            else:
+                st.error("Analysis failed for this resume.")
 
 def configure_api_key():
     st.sidebar.title("🔑 API Setup")
@@ -38,8 +213,8 @@ def configure_api_key():
     )
     if api_key:
         try:
-            co = cohere.Client(api_key)
-            _ = co.chat(message="Hello", model="command-a-03-2025")
+            api_key_hash = hashlib.sha256(api_key.encode()).hexdigest()
+            co = _get_client(api_key_hash, api_key)
             st.session_state.api_key_configured = True
             st.session_state.cohere_client = co
             st.sidebar.success("✅ API key validated!")
@@ -76,89 +251,70 @@ def main():
         job_role = st.text_input("Target Job Role*", "", help="Required field")
         job_description = st.text_area("Job Description (Optional)", height=150)
         persona = st.selectbox("Choose Resume Tone", ["Confident", "Professional", "Friendly"])
-        uploaded_file = st.file_uploader("Upload your Resume (PDF or DOCX)*", type=["pdf", "docx"])
+        batch_mode = st.checkbox("Batch mode", help="Screen several resumes against the same job")
+        uploaded_file = st.file_uploader(
+            "Upload Resumes (PDF or DOCX)*" if batch_mode else "Upload your Resume (PDF or DOCX)*",
+            type=["pdf", "docx"],
+            accept_multiple_files=batch_mode
+        )
 
     with col2:
         st.subheader("Analysis Results")
 
         if uploaded_file and job_role:
-            if st.button("🔍 Analyze Resume", type="primary", use_container_width=True):
-                with st.spinner("Extracting text from resume..."):
-                    try:
-                        if uploaded_file.type == "application/pdf":
-                            resume_text = extract_text_from_pdf(uploaded_file)
-                        else:
-                            resume_text = extract_text_from_docx(uploaded_file)
-                        if not resume_text.strip():
-                            st.error("No text could be extracted from the resume.")
-                            return
-                        st.session_state.resume_text = resume_text
-                    except Exception as e:
-                        st.error(f"Error extracting text: {str(e)}")
-                        return
-
-                with st.spinner("Analyzing resume with AI..."):
-                    try:
-                        feedback = analyze_resume_with_llm(
-                            resume_text, job_role, job_description, st.session_state.cohere_client
-                        )
-                        st.session_state.feedback = feedback
-                        st.session_state.analysis_done = True
-                        st.success("Analysis complete!")
-                    except Exception as e:
-                        st.error(f"Error analyzing resume: {str(e)}")
-                        return
-
-                # 📈 Match Score Visualization
-                if job_description:
-                    score = match_score(resume_text, job_description)
-                    st.metric("Match Score", f"{score}%")
-                    st.progress(score / 100)
-
-                    fig = go.Figure(go.Indicator(
-                        mode="gauge+number",
-                        value=score,
-                        title={'text': "Resume Match Score"},
-                        gauge={'axis': {'range': [0, 100]}}
-                    ))
-                    st.plotly_chart(fig)
-
-                    # 🧾 Sidebar Summary
-                    st.sidebar.markdown("### 🔍 Quick Summary")
-                    st.sidebar.markdown(f"**Job Role:** {job_role}")
-                    st.sidebar.markdown(f"**Tone Preference:** {persona}")
-                    st.sidebar.markdown(f"**Match Score:** {score}%")
-
-                    # 🧠 Static Skill Coverage Pie Chart (can be made dynamic later)
-                    st.subheader("🧠 Skill Coverage")
-                    skills_found = 7
-                    skills_missing = 3
-                    fig2, ax2 = plt.subplots()
-                    ax2.pie([skills_found, skills_missing],
-                            labels=["Matched", "Missing"],
-                            autopct="%1.1f%%",
-                            colors=["#4CAF50", "#F44336"])
-                    ax2.set_title("Skill Coverage")
-                    st.pyplot(fig2)
+            # Swap the button for a disabled one while the analysis runs so a
+            # double click can't start a second billed request, then rerun so
+            # the real button comes back and the results render from session_state
+            button_slot = st.empty()
+            if button_slot.button("🔍 Analyze Resume", type="primary", use_container_width=True):
+                button_slot.button("⏳ Analyzing…", disabled=True, use_container_width=True, key="analyze_busy")
+                if batch_mode:
+                    run_batch_analysis(uploaded_file, job_role, job_description)
+                else:
+                    run_analysis(uploaded_file, job_role, job_description, persona)
+                st.rerun()
+
+        # Show the outcome of the last analysis once, on the rerun that follows it
+        if st.session_state.analysis_status:
+            kind, message = st.session_state.analysis_status
+            st.session_state.analysis_status = None
+            getattr(st, kind)(message)
+
+        if batch_mode:
+            render_batch_results()
+            return
+
+        # 📈 Match Score Visualization
+        if st.session_state.score is not None:
+            render_score(st.session_state.score)
+
+            # 🧾 Sidebar Summary
+            st.sidebar.markdown("### 🔍 Quick Summary")
+            st.sidebar.markdown(f"**Job Role:** {st.session_state.job_role}")
+            st.sidebar.markdown(f"**Tone Preference:** {st.session_state.persona}")
+            st.sidebar.markdown(f"**Match Score:** {st.session_state.score}%")
+
+            # 🧠 Skill Coverage: skills the job description asks for vs. those in the resume
+            st.subheader("🧠 Skill Coverage")
+            if st.session_state.skill_coverage:
+                st.image(skill_pie_png(*st.session_state.skill_coverage))
+            else:
+                st.info("No recognised skills found in the job description.")
 
         if st.session_state.feedback:
             st.subheader("📋 Feedback Report")
             with st.expander("View Detailed Feedback", expanded=True):
                 st.markdown(st.session_state.feedback)
-            if st.button("📥 Download Feedback as PDF", use_container_width=True):
-                with st.spinner("Generating PDF..."):
-                    try:
-                        pdf_path = export_feedback_as_pdf(st.session_state.feedback)
-                        with open(pdf_path, "rb") as f:
-                            st.download_button(
-                                label="Download PDF Report",
-                                data=f,
-                                file_name="resume_feedback_report.pdf",
-                                mime="application/pdf",
-                                use_container_width=True
-                            )
-                    except Exception as e:
-                        st.error(f"Error generating PDF: {str(e)}")
+            try:
+                st.download_button(
+                    label="📥 Download Feedback as PDF",
+                    data=_feedback_pdf(st.session_state.feedback),
+                    file_name="resume_feedback_report.pdf",
+                    mime="application/pdf",
+                    use_container_width=True
+                )
+            except Exception as e:
+                st.error(f"Error generating PDF: {str(e)}")
         elif st.session_state.analysis_done:
             st.info("Upload a resume and enter a job role to get started.")
 
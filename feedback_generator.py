@@ -1,32 +1,103 @@
+import re
 import time
+import random
+import hashlib
 import logging
-from typing import Optional
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Set, Tuple
 import cohere
-from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+import streamlit as st
 
+# Cached so unrelated widget reruns don't re-vectorize the texts
+@st.cache_data(ttl=3600, show_spinner=False)
 def match_score(resume_text, job_description):
-    vect = CountVectorizer().fit_transform([resume_text, job_description])
-    score = cosine_similarity(vect)[0][1]
-    return round(score * 100, 2)
+    return batch_match_scores([resume_text], job_description)[0]
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
+def batch_match_scores(resume_texts: List[str], job_description: str) -> List[float]:
+    """
+    Score many resumes against one job description with a single sparse product.
+    """
+    # Imported lazily; sklearn is only needed once a job description is given
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    # Hashing skips building a vocabulary, and with L2-normalized rows the
+    # dot product is already the cosine similarity
+    vect = HashingVectorizer(n_features=2**18, alternate_sign=False, norm='l2')
+    resumes = vect.transform(resume_texts)
+    job = vect.transform([job_description])
+    scores = (resumes @ job.T).toarray().ravel()
+    return [round(float(score) * 100, 2) for score in scores]
+
+# Skills recognised for the Skill Coverage chart
+SKILL_KEYWORDS = (
+    "python", "java", "javascript", "typescript", "c++", "c#", "golang", "rust", "sql",
+    "html", "css", "react", "angular", "vue", "node.js", "django", "flask", "spring",
+    "aws", "azure", "gcp", "docker", "kubernetes", "terraform", "linux", "git", "ci/cd",
+    "machine learning", "deep learning", "nlp", "computer vision", "data analysis",
+    "pandas", "numpy", "scikit-learn", "tensorflow", "pytorch", "spark", "hadoop",
+    "tableau", "power bi", "excel", "mongodb", "postgresql", "mysql", "redis",
+    "rest api", "graphql", "microservices", "agile", "scrum", "jira",
+    "project management", "communication", "leadership",
+)
+
+def _compile_skill_pattern(skills) -> "re.Pattern":
+    # One alternation scans the text once instead of once per skill. Longest
+    # first so "java" doesn't shadow "javascript"; the lookarounds stand in for
+    # \b, which doesn't work next to symbols like the "+" in "c++".
+    alternation = "|".join(map(re.escape, sorted(skills, key=len, reverse=True)))
+    return re.compile(rf"(?<![\w+#])(?:{alternation})(?![\w+#])", re.IGNORECASE)
+
+SKILL_PATTERN = _compile_skill_pattern(SKILL_KEYWORDS)
+
+def find_skills(text: str) -> Set[str]:
+    """
+    Return the known skills mentioned in the text, lowercased.
+    """
+    return {match.lower() for match in SKILL_PATTERN.findall(text)}
+
+# Set up logging, leaving any configuration done by the importing app alone
+if not logging.getLogger().handlers:
+    logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # Constants
 DEFAULT_MODEL = "command-a-03-2025"
 MAX_RETRIES = 3
-RETRY_DELAY = 10  # seconds
+MAX_RESUME_CHARS = 8000  # resume text beyond this is never sent to the model
+RETRY_BASE_DELAY = 1  # seconds, doubled on each retry
+MAX_RETRY_DELAY = 60  # seconds
+RESPONSE_CACHE_TTL = 24 * 3600  # seconds
+RESPONSE_CACHE_MAX_ENTRIES = 256
+BATCH_MAX_WORKERS = 4  # concurrent Cohere requests in batch mode
+
+# Static reviewer instructions, sent as the preamble so the prefix stays identical across calls
+REVIEWER_PREAMBLE = """
+As an expert resume reviewer, analyze the resume you are given for the target job role.
+
+Provide structured feedback in these sections:
+
+1. Missing Skills
+2. Formatting Improvements
+3. Content Suggestions
+4. Experience Tailoring
+5. Overall Recommendations
+
+Be specific and actionable. Use bullet points.
+""".strip()
 
 def analyze_resume_with_llm(
     resume_text: str,
     job_role: str,
     job_description: str,
-    cohere_client: cohere.Client
+    cohere_client: cohere.Client,
+    on_text: Optional[Callable[[str], None]] = None
 ) -> Optional[str]:
     """
     Analyze a resume against a job role and description using Cohere's Command R+ model.
+
+    If ``on_text`` is given it is called with the accumulated feedback as tokens stream in.
     """
     # Input validation
     if not resume_text.strip():
@@ -34,39 +105,150 @@ def analyze_resume_with_llm(
     if not job_role.strip():
         raise ValueError("Job role cannot be empty")
 
-    # Prompt construction
-    prompt = f"""
-    As an expert resume reviewer, analyze this resume for the target job role.
+    resume_text = resume_text[:MAX_RESUME_CHARS]
+    key = _response_key(resume_text, job_role, job_description)
+    cached = _cached_response(key)
+    if cached is not None:
+        return cached
 
-    JOB ROLE: {job_role}
-    JOB DESCRIPTION: {job_description if job_description else 'Not provided'}
+    feedback, complete = _stream_analysis(resume_text, job_role, job_description, cohere_client, on_text)
+    if complete:
+        _store_response(key, feedback)
+    return feedback
 
-    RESUME CONTENT:
-    {resume_text[:8000]}
+def analyze_resumes_batch(
+    inputs: List[Tuple[str, str, str]],
+    cohere_client: cohere.Client,
+    max_workers: int = BATCH_MAX_WORKERS
+) -> List[Optional[str]]:
+    """
+    Analyze several (resume_text, job_role, job_description) inputs with bounded concurrency.
 
-    Provide structured feedback in these sections:
+    Results keep the order of ``inputs``; an analysis that fails is logged and returned as None.
+    Identical inputs are only sent once.
+    """
+    # The response cache is read and written on this thread; the workers only
+    # talk to Cohere, so no Streamlit calls happen without a script context
+    keys = []
+    pending = {}
+    results = {}
+    for i, (resume_text, job_role, job_description) in enumerate(inputs):
+        if not resume_text.strip() or not job_role.strip():
+            logger.error("Batch input %d is missing resume text or job role", i)
+            keys.append(None)
+            continue
+        resume_text = resume_text[:MAX_RESUME_CHARS]
+        key = _response_key(resume_text, job_role, job_description)
+        keys.append(key)
+        if key in results or key in pending:
+            continue
+        cached = _cached_response(key)
+        if cached is not None:
+            results[key] = cached
+        else:
+            pending[key] = (resume_text, job_role, job_description)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            key: executor.submit(_stream_analysis, resume_text, job_role, job_description, cohere_client, None)
+            for key, (resume_text, job_role, job_description) in pending.items()
+        }
+
+    for key, future in futures.items():
+        try:
+            feedback, complete = future.result()
+        except Exception as e:
+            logger.error("Batch analysis failed: %s", e)
+            results[key] = None
+            continue
+        if complete:
+            _store_response(key, feedback)
+        results[key] = feedback
+
+    return [results.get(key) if key else None for key in keys]
+
+# Shared across sessions like st.cache_data, but filled after streaming so the
+# UI can render tokens from outside the cached call. Entries are kept in
+# insertion order, so the oldest (and first to expire) sit at the front.
+@st.cache_resource(show_spinner=False)
+def _response_cache() -> "OrderedDict[str, Tuple[float, str]]":
+    return OrderedDict()
+
+_response_cache_lock = threading.Lock()
 
-    1. Missing Skills
-    2. Formatting Improvements  
-    3. Content Suggestions
-    4. Experience Tailoring
-    5. Overall Recommendations
+def _response_key(resume_text: str, job_role: str, job_description: str) -> str:
+    return hashlib.sha256(
+        "\x00".join([resume_text, job_role, job_description or ""]).encode()
+    ).hexdigest()
 
-    Be specific and actionable. Use bullet points.
+def _cached_response(key: str) -> Optional[str]:
+    cache = _response_cache()
+    with _response_cache_lock:
+        cached = cache.get(key)
+    if cached and time.time() - cached[0] < RESPONSE_CACHE_TTL:
+        return cached[1]
+    return None
+
+def _store_response(key: str, feedback: str) -> None:
+    cache = _response_cache()
+    now = time.time()
+    with _response_cache_lock:
+        cache[key] = (now, feedback)
+        cache.move_to_end(key)
+        while cache:
+            oldest_key, (stored_at, _) = next(iter(cache.items()))
+            if now - stored_at < RESPONSE_CACHE_TTL and len(cache) <= RESPONSE_CACHE_MAX_ENTRIES:
+                break
+            del cache[oldest_key]
+
+def _stream_analysis(
+    resume_text: str,
+    job_role: str,
+    job_description: str,
+    cohere_client: cohere.Client,
+    on_text: Optional[Callable[[str], None]]
+) -> Tuple[str, bool]:
+    """
+    Stream the analysis, returning the text and whether the model finished normally.
     """
+    # Prompt construction: only the variable fields go in the message
+    prompt = (
+        f"JOB ROLE: {job_role}\n"
+        f"JOB DESCRIPTION: {job_description if job_description else 'Not provided'}\n\n"
+        f"RESUME CONTENT:\n{resume_text}"
+    )
 
     # Retry logic for API calls
     for attempt in range(MAX_RETRIES):
         try:
-            response = cohere_client.chat(
+            stream = cohere_client.chat_stream(
+                preamble=REVIEWER_PREAMBLE,
                 message=prompt,
                 model=DEFAULT_MODEL
             )
-            return response.text
+            chunks = []
+            finish_reason = None
+            for event in stream:
+                if event.event_type == "text-generation":
+                    chunks.append(event.text)
+                    if on_text:
+                        on_text("".join(chunks))
+                elif event.event_type == "stream-end":
+                    finish_reason = event.finish_reason
+            feedback = "".join(chunks)
+            if not feedback.strip():
+                raise Exception(f"Cohere returned no text (finish reason: {finish_reason})")
+            complete = finish_reason == "COMPLETE"
+            if not complete:
+                logger.warning("Cohere response ended early (finish reason: %s)", finish_reason)
+            return feedback, complete
         except Exception as e:
-            logger.warning(f"Cohere API call failed (attempt {attempt + 1}): {str(e)}")
-            time.sleep(RETRY_DELAY)
-    
+            # Client errors (bad key, bad request) won't succeed on retry; 429 and 5xx might
+            status_code = getattr(e, "status_code", None)
+            if status_code is not None and 400 <= status_code < 500 and status_code != 429:
+                raise
+            logger.warning("Cohere API call failed (attempt %d): %s", attempt + 1, e)
+            if attempt < MAX_RETRIES - 1:
+                time.sleep(min(MAX_RETRY_DELAY, RETRY_BASE_DELAY * 2 ** attempt + random.random()))
 
     raise Exception("Failed to analyze resume after multiple attempts.")
-
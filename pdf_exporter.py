@@ -4,22 +4,20 @@ from reportlab.lib.styles import getSampleStyleSheet
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
 from reportlab.lib.units import inch
 from reportlab.lib import colors
-import tempfile
+import io
 import textwrap
 import logging
 
 logger = logging.getLogger(__name__)
 
-def export_feedback_as_pdf(feedback_text: str) -> str:
+def export_feedback_as_pdf(feedback_text: str) -> bytes:
     """
-    Export feedback text to a well-formatted PDF.
+    Export feedback text to a well-formatted PDF, returned as bytes.
     """
     try:
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
-        temp_path = temp_file.name
-        temp_file.close()
+        buffer = io.BytesIO()
         
-        doc = SimpleDocTemplate(temp_path, pagesize=letter,
+        doc = SimpleDocTemplate(buffer, pagesize=letter,
                                 rightMargin=72, leftMargin=72,
                                 topMargin=72, bottomMargin=72)
         
@@ -66,18 +64,18 @@ def export_feedback_as_pdf(feedback_text: str) -> str:
             story.append(Paragraph('<br/>'.join(current_section), styles['BodyText']))
         
         doc.build(story)
-        return temp_path
+        return buffer.getvalue()
         
     except Exception as e:
         logger.error(f"Error generating PDF: {e}")
         return export_feedback_simple(feedback_text)
 
-def export_feedback_simple(feedback_text: str) -> str:
+def export_feedback_simple(feedback_text: str) -> bytes:
     """
     Simple fallback PDF export method.
     """
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
-    c = canvas.Canvas(temp_file.name, pagesize=letter)
+    buffer = io.BytesIO()
+    c = canvas.Canvas(buffer, pagesize=letter)
     
     y_position = 750
     line_height = 14
@@ -107,4 +105,4 @@ def export_feedback_simple(feedback_text: str) -> str:
         y_position -= 2  # Small space between lines
     
     c.save()
-    return temp_file.name
\ No newline at end of file
+    return buffer.getvalue()
\ No newline at end of file